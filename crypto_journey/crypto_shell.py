@@ -2,31 +2,136 @@
 """
 Crypto Trading Shell - A minimalist CLI shell for crypto trading strategies.
 """
+import argparse
 import cmd
 import sys
 import os
 import json
+import copy
 import datetime
+import queue
+import threading
+from functools import lru_cache
+from pathlib import Path
 from colorama import Fore, Style, init
 
-# For crypto trading
-from lumibot.entities import Asset
-from lumibot.backtesting import CcxtBacktesting
-
 # Initialize colorama
 init(autoreset=True)
 
+# Colorized prefixes, built once instead of on every print
+ERR, OK, INFO, WARN, TEXT, RESET = (
+    Fore.RED, Fore.GREEN, Fore.CYAN, Fore.YELLOW, Fore.WHITE, Style.RESET_ALL
+)
+ERR_PREFIX = f"{ERR}Error: "
+
+HELP_MENU = "\n".join([
+    f"{INFO}Available commands:",
+    f"{OK}help{RESET} - Show this help message",
+    f"{OK}quit, exit{RESET} - Exit the shell",
+    f"{OK}version{RESET} - Show version information",
+    f"{WARN}\nTrading Commands:",
+    f"{OK}list_exchanges{RESET} - List available exchanges",
+    f"{OK}list_strategies{RESET} - List available trading strategies",
+    f"{OK}show_config{RESET} - Show current configuration",
+    f"{OK}set_parameter <name> <value>{RESET} - Set configuration parameter",
+    f"{OK}save_config <filename> [--pretty]{RESET} - Save configuration to file",
+    f"{OK}load_config <filename>{RESET} - Load configuration from file",
+    f"{OK}await_saves{RESET} - Wait for queued configuration saves to finish",
+    f"{OK}run_backtest{RESET} - Run backtest with current configuration",
+])
+
+# Available exchanges and strategies, in display order
+_EXCHANGE_DISPLAY = ('coinbase', 'kraken', 'binance', 'bitfinex')
+_STRATEGY_DISPLAY = ('random', 'sma_crossover', 'rsi_strategy', 'sentiment_based')
+
+# Sets for membership checks
+EXCHANGES = frozenset(_EXCHANGE_DISPLAY)
+STRATEGIES = frozenset(_STRATEGY_DISPLAY)
+
+_DATE_PARAMS = frozenset({'start_date', 'end_date'})
+
+@lru_cache(maxsize=128)
+def _parse_ymd(value):
+    """Parse a YYYY-MM-DD string, memoized since the same dates recur."""
+    parsed = datetime.datetime.fromisoformat(value)
+    # fromisoformat also accepts times, week dates and compact forms;
+    # only plain YYYY-MM-DD is a valid parameter value
+    if parsed.date().isoformat() != value:
+        raise ValueError(f"not a YYYY-MM-DD date: {value!r}")
+    return parsed
+
+@lru_cache(maxsize=128)
+def _parse_loaded_ymd(value):
+    """Parse a date read from a config file.
+
+    Older versions validated dates with strptime and saved them as typed,
+    so files may hold unpadded dates like 2023-6-1.
+    """
+    return datetime.datetime.strptime(value, '%Y-%m-%d')
+
+# ----- parameter validators -----
+# Each validator returns (True, parsed_value) or (False, error_message).
+def _v_identity(value):
+    return True, value
+
+def _v_exchange(value):
+    if value not in EXCHANGES:
+        return False, (f"Unknown exchange: {value}\n"
+                       f"{RESET}Use 'list_exchanges' to see available options.")
+    return True, value
+
+def _v_strategy(value):
+    if value not in STRATEGIES:
+        return False, (f"Unknown strategy: {value}\n"
+                       f"{RESET}Use 'list_strategies' to see available options.")
+    return True, value
+
+def _v_float01(value):
+    try:
+        value = float(value)
+    except ValueError:
+        return False, "cash_at_risk must be a float value"
+    if value <= 0 or value > 1:
+        return False, "cash_at_risk must be between 0 and 1"
+    return True, value
+
+def _v_bool(value):
+    lowered = value.lower()
+    if lowered in ('true', 'on', 'yes', '1'):
+        return True, True
+    if lowered in ('false', 'off', 'no', '0'):
+        return True, False
+    return False, f"Expected true or false, got: {value}"
+
+def _v_date(value):
+    try:
+        parsed = _parse_ymd(value)
+    except ValueError:
+        return False, "Invalid date format. Use YYYY-MM-DD"
+    return True, parsed
+
+_VALIDATORS = {
+    'exchange': _v_exchange,
+    'strategy': _v_strategy,
+    'cash_at_risk': _v_float01,
+    **dict.fromkeys(_DATE_PARAMS, _v_date),
+    'verbose': _v_bool,
+}
+
+# Parameters that control the shell itself; stored as attributes, not in config
+_SHELL_PARAMS = frozenset({'verbose'})
+
 class CryptoShell(cmd.Cmd):
     """Simple command processor for crypto trading."""
     
-    intro = f"""{Fore.CYAN}
+    intro = f"""{INFO}
     ╔═══════════════════════════════════════════════╗
-    ║  {Fore.YELLOW}Crypto Trading Shell v0.1{Fore.CYAN}                   ║
+    ║  {WARN}Crypto Trading Shell v0.1{INFO}                   ║
     ║  Type 'help' or '?' to list commands.         ║
     ║  Type 'exit' or 'quit' to exit.              ║
     ╚═══════════════════════════════════════════════╝
     """
-    prompt = f'{Fore.GREEN}crypto> {Style.RESET_ALL}'
+    prompt = f'{OK}crypto> {RESET}'
     
     # Trading configuration
     config = {
@@ -41,13 +146,98 @@ class CryptoShell(cmd.Cmd):
     }
     
     # Available exchanges and strategies
-    available_exchanges = ['coinbase', 'kraken', 'binance', 'bitfinex']
-    available_strategies = ['random', 'sma_crossover', 'rsi_strategy', 'sentiment_based']
+    available_exchanges = EXCHANGES
+    available_strategies = STRATEGIES
+    
+    # Show the full configuration before running a backtest
+    verbose = False
+    
+    # Directory config files are saved to and loaded from
+    _CONFIG_DIR = Path('crypto_journey')
+    _DEFAULT_CONFIG = 'crypto_config.json'
+    
+    # Parsed config files keyed by (abspath, st_mtime_ns, st_size)
+    _config_cache: dict[tuple[str, int, int], dict] = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Build the command table once instead of looking up do_* on every line
+        self._dispatch = {name[3:]: getattr(self, name)
+                          for name in dir(self) if name.startswith('do_')}
+        # Config saves are written by a background thread so the prompt
+        # doesn't wait on disk IO
+        self._io_q = queue.Queue()
+        threading.Thread(target=self._io_worker, daemon=True).start()
+        # Read the default config in the background so the first
+        # load_config finds it already parsed
+        self._prefetched = None
+        threading.Thread(target=self._prefetch_default_config, daemon=True).start()
+        # Argument parsers are built once and reused for every command
+        self._set_parser = argparse.ArgumentParser(
+            prog='set_parameter', description='Set configuration parameter.')
+        self._set_parser.add_argument('name', type=str.lower, help='parameter name')
+        self._set_parser.add_argument('value', help='new value')
+        # Parsed start/end dates, kept in sync with the string values in config
+        self._dates = self._parse_dates(self.config)
+    
+    @staticmethod
+    def _parse_dates(config):
+        """Parse the date parameters present in a loaded config dict."""
+        dates = {}
+        for name in _DATE_PARAMS:
+            if name in config:
+                value = config[name]
+                try:
+                    dates[name] = _parse_loaded_ymd(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid {name} {value!r}, expected YYYY-MM-DD") from None
+        return dates
+    
+    def _io_worker(self):
+        """Write queued (path, config, pretty) saves to disk."""
+        while True:
+            path, config, pretty = self._io_q.get()
+            # Write to a temp file and swap it in so a failed save never
+            # leaves a truncated config behind
+            tmp_path = path + '.tmp'
+            try:
+                if pretty:
+                    data = json.dumps(config, indent=4)
+                else:
+                    data = json.dumps(config, separators=(',', ':'))
+                with open(tmp_path, 'w') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                # Drop any cached parse of the file we just overwrote
+                for key in [k for k in list(self._config_cache) if k[0] == path]:
+                    self._config_cache.pop(key, None)
+            except Exception as e:
+                print(f"{ERR}Error saving configuration to {path}: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            finally:
+                self._io_q.task_done()
+    
+    def _prefetch_default_config(self):
+        """Parse the default config file into self._prefetched, if it exists."""
+        try:
+            path = str((self._CONFIG_DIR / self._DEFAULT_CONFIG).absolute())
+            st = os.stat(path)
+            with open(path, 'r') as f:
+                parsed = json.load(f)
+            self._prefetched = ((path, st.st_mtime_ns, st.st_size), parsed)
+        except Exception:
+            # Missing or broken files are reported by load_config itself
+            pass
     
     # ----- basic commands -----
     def do_exit(self, arg):
         """Exit the shell."""
-        print(f"{Fore.YELLOW}Goodbye!")
+        # Don't let the daemon writer die with saves still pending
+        self._io_q.join()
+        print(WARN + "Goodbye!")
         return True
         
     def do_quit(self, arg):
@@ -61,139 +251,148 @@ class CryptoShell(cmd.Cmd):
             super().do_help(arg)
         else:
             # Show custom help menu
-            print(f"{Fore.CYAN}Available commands:")
-            print(f"{Fore.GREEN}help{Style.RESET_ALL} - Show this help message")
-            print(f"{Fore.GREEN}quit, exit{Style.RESET_ALL} - Exit the shell")
-            print(f"{Fore.GREEN}version{Style.RESET_ALL} - Show version information")
-            print(f"{Fore.YELLOW}\nTrading Commands:")
-            print(f"{Fore.GREEN}list_exchanges{Style.RESET_ALL} - List available exchanges")
-            print(f"{Fore.GREEN}list_strategies{Style.RESET_ALL} - List available trading strategies")
-            print(f"{Fore.GREEN}show_config{Style.RESET_ALL} - Show current configuration")
-            print(f"{Fore.GREEN}set_parameter <name> <value>{Style.RESET_ALL} - Set configuration parameter")
-            print(f"{Fore.GREEN}save_config <filename>{Style.RESET_ALL} - Save configuration to file")
-            print(f"{Fore.GREEN}load_config <filename>{Style.RESET_ALL} - Load configuration from file")
-            print(f"{Fore.GREEN}run_backtest{Style.RESET_ALL} - Run backtest with current configuration")
+            print(HELP_MENU)
             
     def do_version(self, arg):
         """Show version information."""
-        print(f"{Fore.CYAN}Crypto Trading Shell v0.1")
+        print(INFO + "Crypto Trading Shell v0.1")
         print(f"Running on Python {sys.version.split()[0]}")
     
     # ----- trading commands -----
     def do_list_exchanges(self, arg):
         """List available exchanges."""
-        print(f"{Fore.CYAN}Available exchanges:")
-        for exchange in self.available_exchanges:
-            status = "(current)" if exchange == self.config['exchange'] else ""
-            print(f"{Fore.GREEN}{exchange} {Fore.YELLOW}{status}")
+        current = self.config['exchange']
+        sys.stdout.write(INFO + "Available exchanges:\n" + "".join(
+            f"{OK}{exchange} {WARN}{'(current)' if exchange == current else ''}\n"
+            for exchange in _EXCHANGE_DISPLAY))
     
     def do_list_strategies(self, arg):
         """List available trading strategies."""
-        print(f"{Fore.CYAN}Available strategies:")
-        for strategy in self.available_strategies:
-            status = "(current)" if strategy == self.config['strategy'] else ""
-            print(f"{Fore.GREEN}{strategy} {Fore.YELLOW}{status}")
+        current = self.config['strategy']
+        sys.stdout.write(INFO + "Available strategies:\n" + "".join(
+            f"{OK}{strategy} {WARN}{'(current)' if strategy == current else ''}\n"
+            for strategy in _STRATEGY_DISPLAY))
     
     def do_show_config(self, arg):
         """Show current configuration."""
-        print(f"{Fore.CYAN}Current configuration:")
-        for key, value in self.config.items():
-            print(f"{Fore.GREEN}{key}: {Fore.WHITE}{value}")
+        sys.stdout.write(INFO + "Current configuration:\n" + "".join(
+            f"{OK}{key}: {TEXT}{value}\n" for key, value in self.config.items()))
     
     def do_set_parameter(self, arg):
         """Set configuration parameter."""
-        args = arg.split()
-        if len(args) < 2:
-            print(f"{Fore.RED}Error: Missing parameter name or value")
-            print("Usage: set_parameter <name> <value>")
+        try:
+            ns = self._set_parser.parse_args(arg.split())
+        except SystemExit:
+            # argparse has already printed the usage error (or -h help)
             return
         
-        param_name = args[0].lower()
-        param_value = args[1]
+        param_name = ns.name
+        param_value = ns.value
         
-        # Handle special cases for validation
-        if param_name == 'exchange':
-            if param_value not in self.available_exchanges:
-                print(f"{Fore.RED}Error: Unknown exchange: {param_value}")
-                print("Use 'list_exchanges' to see available options.")
-                return
-        elif param_name == 'strategy':
-            if param_value not in self.available_strategies:
-                print(f"{Fore.RED}Error: Unknown strategy: {param_value}")
-                print("Use 'list_strategies' to see available options.")
-                return
-        elif param_name == 'cash_at_risk':
-            try:
-                param_value = float(param_value)
-                if param_value <= 0 or param_value > 1:
-                    print(f"{Fore.RED}Error: cash_at_risk must be between 0 and 1")
-                    return
-            except ValueError:
-                print(f"{Fore.RED}Error: cash_at_risk must be a float value")
-                return
-        elif param_name in ['start_date', 'end_date']:
-            try:
-                # Validate date format
-                datetime.datetime.strptime(param_value, '%Y-%m-%d')
-            except ValueError:
-                print(f"{Fore.RED}Error: Invalid date format. Use YYYY-MM-DD")
-                return
+        # Validate and convert the value for parameters that need it
+        ok, result = _VALIDATORS.get(param_name, _v_identity)(param_value)
+        if not ok:
+            print(ERR_PREFIX + result)
+            return
+        if param_name not in _DATE_PARAMS:
+            param_value = result
         
         # Update config if validation passed
-        if param_name in self.config:
+        if param_name in _SHELL_PARAMS:
+            setattr(self, param_name, param_value)
+            print(f"{OK}Parameter {param_name} set to {param_value}")
+        elif param_name in self.config:
             self.config[param_name] = param_value
-            print(f"{Fore.GREEN}Parameter {param_name} set to {param_value}")
+            if param_name in _DATE_PARAMS:
+                # Keep the parsed date for run_backtest; config stays string-only
+                self._dates[param_name] = result
+            print(f"{OK}Parameter {param_name} set to {param_value}")
         else:
-            print(f"{Fore.RED}Error: Unknown parameter: {param_name}")
-            print("Available parameters: " + ", ".join(self.config.keys()))
+            print(f"{ERR_PREFIX}Unknown parameter: {param_name}")
+            print("Available parameters: " + ", ".join([*self.config, *sorted(_SHELL_PARAMS)]))
     
     def do_save_config(self, arg):
-        """Save configuration to file."""
-        if not arg:
-            filename = 'crypto_config.json'
+        """Save configuration to file. Add --pretty for indented JSON."""
+        args = arg.split()
+        pretty = '--pretty' in args
+        args = [a for a in args if a != '--pretty']
+        if not args:
+            filename = self._DEFAULT_CONFIG
         else:
-            filename = arg
+            filename = args[0]
             if not filename.endswith('.json'):
                 filename += '.json'
         
-        try:
-            with open(os.path.join('crypto_journey', filename), 'w') as f:
-                json.dump(self.config, f, indent=4)
-            print(f"{Fore.GREEN}Configuration saved to {filename}")
-        except Exception as e:
-            print(f"{Fore.RED}Error saving configuration: {e}")
+        path = str((self._CONFIG_DIR / filename).absolute())
+        # Snapshot the config so later set_parameter calls can't race the writer
+        self._io_q.put((path, copy.deepcopy(self.config), pretty))
+        print(f"{OK}Queued save of configuration to {filename}")
+    
+    def do_await_saves(self, arg):
+        """Wait until all queued configuration saves are written."""
+        self._io_q.join()
+        print(OK + "All configuration saves written")
     
     def do_load_config(self, arg):
         """Load configuration from file."""
         if not arg:
-            filename = 'crypto_config.json'
+            filename = self._DEFAULT_CONFIG
         else:
             filename = arg
             if not filename.endswith('.json'):
                 filename += '.json'
         
+        # Make sure a queued save of this file isn't still in flight
+        self._io_q.join()
         try:
-            with open(os.path.join('crypto_journey', filename), 'r') as f:
-                self.config = json.load(f)
-            print(f"{Fore.GREEN}Configuration loaded from {filename}")
+            path = str((self._CONFIG_DIR / filename).absolute())
+            st = os.stat(path)
+            key = (path, st.st_mtime_ns, st.st_size)
+            cached = self._config_cache.get(key)
+            if cached is None:
+                prefetched = self._prefetched
+                if prefetched is not None and prefetched[0] == key:
+                    cached = prefetched[1]
+                else:
+                    with open(path, 'r') as f:
+                        cached = json.load(f)
+                self._config_cache[key] = cached
+            try:
+                dates = self._parse_dates(cached)
+            except ValueError as e:
+                print(f"{ERR_PREFIX}{e} in {filename}")
+                return
+            config = copy.copy(cached)
+            # Normalize to the zero-padded form set_parameter stores
+            for name, parsed in dates.items():
+                config[name] = parsed.date().isoformat()
+            self.config = config
+            self._dates = dates
+            print(f"{OK}Configuration loaded from {filename}")
         except FileNotFoundError:
-            print(f"{Fore.RED}Error: File not found: {filename}")
+            print(f"{ERR_PREFIX}File not found: {filename}")
         except json.JSONDecodeError:
-            print(f"{Fore.RED}Error: Invalid JSON format in {filename}")
+            print(f"{ERR_PREFIX}Invalid JSON format in {filename}")
         except Exception as e:
-            print(f"{Fore.RED}Error loading configuration: {e}")
+            print(f"{ERR}Error loading configuration: {e}")
     
     def do_run_backtest(self, arg):
         """Run backtest with current configuration."""
         try:
-            print(f"{Fore.CYAN}Initializing backtest with configuration:")
-            self.do_show_config("")
+            if self.verbose:
+                print(INFO + "Initializing backtest with configuration:")
+                self.do_show_config("")
+            
+            print(f"\n{WARN}Starting backtest... This may take a moment.")
             
-            print(f"\n{Fore.YELLOW}Starting backtest... This may take a moment.")
+            # Imported here so starting the shell doesn't pull in lumibot (and
+            # with it pandas/ccxt) for sessions that never run a backtest
+            from lumibot.entities import Asset
+            from lumibot.backtesting import CcxtBacktesting
             
-            # Parse dates
-            start_date = datetime.datetime.strptime(self.config['start_date'], '%Y-%m-%d')
-            end_date = datetime.datetime.strptime(self.config['end_date'], '%Y-%m-%d')
+            # Dates were parsed when they were set or loaded
+            start_date = self._dates['start_date']
+            end_date = self._dates['end_date']
             
             # Set up backtest parameters
             exchange_id = self.config['exchange']
@@ -204,29 +403,51 @@ class CryptoShell(cmd.Cmd):
             
             # This is a placeholder for actual backtest execution
             # In a future update, we'll import and run actual strategies
-            print(f"\n{Fore.RED}Note: This is a placeholder for the backtest functionality.")
-            print(f"{Fore.RED}In the future, this will run the actual {self.config['strategy']} strategy.")
+            print(f"\n{ERR}Note: This is a placeholder for the backtest functionality.")
+            print(f"{ERR}In the future, this will run the actual {self.config['strategy']} strategy.")
             
         except Exception as e:
-            print(f"{Fore.RED}Error running backtest: {e}")
+            print(f"{ERR}Error running backtest: {e}")
     
     # Override methods
+    def onecmd(self, line):
+        """Dispatch a command through the precomputed command table."""
+        line = line.strip()
+        if not line:
+            return self.emptyline()
+        if line[0] == '?':
+            line = 'help ' + line[1:]
+        self.lastcmd = line
+        # Split on any whitespace, as cmd.Cmd.parseline does
+        name, *rest = line.split(None, 1)
+        fn = self._dispatch.get(name)
+        if fn is None:
+            return self.default(line)
+        return fn(rest[0] if rest else '')
+    
     def emptyline(self):
         """Do nothing on empty line."""
         pass
     
     def default(self, line):
         """Handle unknown command."""
-        print(f"{Fore.RED}Unknown command: {line}")
-        print(f"Type 'help' to see available commands.")
+        print(f"{ERR}Unknown command: {line}")
+        print("Type 'help' to see available commands.")
 
 def main():
+    shell = None
     try:
-        CryptoShell().cmdloop()
+        shell = CryptoShell()
+        shell.cmdloop()
     except KeyboardInterrupt:
         print("\nExiting due to keyboard interrupt")
     except Exception as e:
-        print(f"{Fore.RED}Error: {e}")
+        print(f"{ERR_PREFIX}{e}")
+    finally:
+        # However the loop ended, let queued saves finish before the
+        # daemon writer thread is killed at interpreter exit
+        if shell is not None:
+            shell._io_q.join()
         
 if __name__ == '__main__':
     main()
@@ -3,12 +3,23 @@ from lumibot.backtesting import CcxtBacktesting
 from lumibot.strategies.strategy import Strategy
 from datetime import datetime
 from colorama import Fore
+import logging
 import random
 import sys
 
+log = logging.getLogger("randobot")
+
+# Random decisions are drawn in batches of this size
+CHOICE_BATCH = 4096
+
+# Order side for each random decision: 0 = hold, 1 = buy, 2 = sell
+SIDES = (None, "buy", "sell")
+OPPOSITE = {"buy": "sell", "sell": "buy"}
+
+_ORDER_PRE = Fore.LIGHTMAGENTA_EX
 
-class MLTrader(Strategy):
 
+class MLTrader(Strategy):
     def initialize(self, cash_at_risk: float = 0.2, coin: str = "BTC", quote: str = "USDT"):
         self.set_market("24/7")
         self.sleeptime = "1D"
@@ -16,59 +27,71 @@ class MLTrader(Strategy):
         self.cash_at_risk = cash_at_risk
         self.coin = coin
         self.quote = quote
+        self._base = Asset(symbol=self.coin, asset_type=Asset.AssetType.CRYPTO)
+        self._quote_asset = Asset(symbol=self.quote, asset_type="crypto")
+        self._choices = random.choices(range(3), k=CHOICE_BATCH)
+        self._idx = 0
 
-    def position_sizing(self):
-        cash = self.get_cash()
-        last_price = self.get_last_price(
-            Asset(symbol=self.coin, asset_type=Asset.AssetType.CRYPTO),
-            quote=Asset(symbol=self.quote, asset_type="crypto"),
-        )
+    def next_choice(self):
+        # Refill the pre-drawn buffer once it is used up
+        if self._idx == len(self._choices):
+            self._choices = random.choices(range(3), k=CHOICE_BATCH)
+            self._idx = 0
+        choice = self._choices[self._idx]
+        self._idx += 1
+        return choice
+
+    def position_sizing(self, cash):
+        last_price = self.get_last_price(self._base, quote=self._quote_asset)
         # Added this to handle missing prices
-        if last_price == None:
+        if last_price is None:
             print(f"Warning: Could not get price for {self.coin}/{self.quote}")
             quantity = 0
         else:
             quantity = cash * self.cash_at_risk / last_price
-        return cash, last_price, quantity
+        return last_price, quantity
 
     def on_trading_iteration(self):
-        cash, last_price, quantity = self.position_sizing()
+        # Nothing to trade with, so skip the price lookup entirely
+        cash = self.get_cash()
+        if cash <= 0:
+            return
 
-        if last_price != None and quantity > 0:
-            if cash > (quantity * last_price):
-                choice = random.choice([0, 1, 2])
+        # Decide before fetching the price: holding doesn't need one
+        side = SIDES[self.next_choice()]
+        if side is None:  # Hold
+            return
 
-                if choice == 0:  # Hold
-                    pass
-                elif choice == 1:  # Buy
-                    if self.last_trade == "sell":
-                        self.sell_all()
-                    order = self.create_order(
-                        Asset(symbol=self.coin, asset_type=Asset.AssetType.CRYPTO),
-                        quantity,
-                        "buy",
-                        type="market",
-                        quote=Asset(symbol=self.quote, asset_type="crypto"),
-                    )
-                    print(Fore.LIGHTMAGENTA_EX + str(order) + Fore.RESET)
-                    self.submit_order(order)
-                    self.last_trade = "buy"
-                elif choice == 2:  # Sell
-                    if self.last_trade == "buy":
-                        self.sell_all()
-                    order = self.create_order(
-                        Asset(symbol=self.coin, asset_type=Asset.AssetType.CRYPTO),
-                        quantity,
-                        "sell",
-                        type="market",
-                        quote=Asset(symbol=self.quote, asset_type="crypto"),
-                    )
-                    print(Fore.LIGHTMAGENTA_EX + str(order) + Fore.RESET)
-                    self.submit_order(order)
-                    self.last_trade = "sell"
+        last_price, quantity = self.position_sizing(cash)
+
+        if last_price is not None and quantity > 0:
+            if cash > (quantity * last_price):
+                # Flip out of the opposite position before trading
+                if self.last_trade == OPPOSITE[side]:
+                    self.sell_all()
+                order = self.create_order(
+                    self._base,
+                    quantity,
+                    side,
+                    type="market",
+                    quote=self._quote_asset,
+                )
+                # Only format the order when someone is listening
+                if log.isEnabledFor(logging.INFO):
+                    log.info("%s%s%s", _ORDER_PRE, order, Fore.RESET)
+                self.submit_order(order)
+                self.last_trade = side
 
 
 if __name__ == "__main__":
+    # Print orders to stdout as before. Use our own handler rather than the
+    # root logger, which lumibot configures and quiets during backtests
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
     try:
         # Use a more recent timeframe for better data availability
         start_date = datetime(2023, 6, 1) 